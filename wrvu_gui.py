@@ -4,32 +4,172 @@ import os
 import sys
 import json
 import re
+import io
+import hashlib
+import functools
+import importlib.util
+from collections import Counter
 from datetime import datetime
 import warnings
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, scrolledtext
 import threading
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
 import subprocess
 import tempfile
 import time
-from PIL import ImageGrab, Image
 import webbrowser
 import urllib.parse
 warnings.filterwarnings("ignore", category=DeprecationWarning)
 
+# Only check the OCR dependencies are installed here - PIL and pytesseract are
+# imported on first use so the window comes up without loading them
+_missing_modules = [name for name in ('pytesseract', 'PIL') if importlib.util.find_spec(name) is None]
+DEPENDENCIES_OK = not _missing_modules
+if not DEPENDENCIES_OK:
+    dependency_error = f"No module named '{_missing_modules[0]}'"
+
+# Optional - finds all generic modality patterns in a single pass over a line
 try:
-    import pytesseract
-    from PIL import Image
-    import numpy as np
-    DEPENDENCIES_OK = True
-except ImportError as e:
-    DEPENDENCIES_OK = False
-    dependency_error = str(e)
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+# Precompiled patterns for the per-line / per-procedure text processing loops
+_DATE_RE = re.compile(r'\d{1,2}-\w{3}-\d{4}')
+_MODALITY_RE = re.compile(r'^(US|CT|MR|XR|CR|RF|FL|PT|PET|BD|DXA|NM|IR)')
+_WORD_RE = re.compile(r'\b\w+\b')
+
+# Very common words that don't add specificity to a procedure name
+_COMMON_WORDS = frozenset({'AND', 'OR', 'THE', 'OF', 'IN', 'ON', 'AT', 'TO', 'FOR', 'VIEW', 'VIEWS'})
+
+# Modality variants in priority order - a later modality wins when several are present
+_MODALITY_MAPPING = (
+    ('XR', ('XR',)),
+    ('CT', ('CT',)),
+    ('MRI', ('MRI', 'MR')),
+    ('US', ('US',)),
+    ('FL', ('FL',)),
+    ('PET', ('PET',)),
+    ('DXA', ('DXA',)),
+    ('NM', ('NM',)),
+)
+_VARIANT_TO_MODALITY = {variant: (priority, modality)
+                        for priority, (modality, variants) in enumerate(_MODALITY_MAPPING)
+                        for variant in variants}
+
+# Key anatomical words that must match exactly
+_ANATOMY_WORDS = frozenset({
+    'CHEST', 'ABDOMEN', 'PELVIS', 'HEAD', 'BRAIN', 'SPINE', 'LUMBAR', 'CERVICAL', 'THORACIC',
+    'KNEE', 'ANKLE', 'SHOULDER', 'ELBOW', 'HIP', 'FOOT', 'HAND', 'WRIST', 'NECK', 'ORBIT'
+})
+
+# PACS abbreviations and OCR fix-ups, applied by clean_pacs_text in one pass
+_CLEAN_MAP = {
+    'CR ': 'XR ',  # Computed Radiography = X-ray
+    'CR\t': 'XR ',
+    'RF ': 'FL ',  # Radiofluoroscopy = Fluoroscopy
+    'RF\t': 'FL ',
+    'XA ': 'ANGIO ',  # X-ray Angiography
+    'XA\t': 'ANGIO ',
+    'DXA ': 'DXA ',  # DXA itself must not be turned into D + ANGIO
+    'DXA\t': 'DXA ',
+    'BD ': 'DXA ',  # Bone Density
+    'BD\t': 'DXA ',
+    'PT ': 'PET ',  # Positron Emission Tomography
+    'PT\t': 'PET ',
+    'MR ': 'MRI ',  # Magnetic Resonance
+    'MR\t': 'MRI ',
+    'DANGIO': 'DXA',  # OCR error fix
+    'MRIHIP': 'MRI HIP',  # OCR error fix
+    # Clean up formatting
+    '\t': ' ',     # Tabs to spaces
+    '_': ' ',      # Underscores to spaces
+    '—': ' ',      # Em dashes to spaces
+    '-': ' ',      # Hyphens to spaces
+    '  ': ' ',     # Double spaces to single
+    '   ': ' ',    # Triple spaces to single
+}
+# Longest keys first so the longest match wins at any position
+_CLEAN_RE = re.compile('|'.join(re.escape(k) for k in sorted(_CLEAN_MAP, key=len, reverse=True)))
+_WS_RE = re.compile(r'\s+')
+
+@functools.lru_cache(maxsize=4096)
+def _clean_pacs_text(text):
+    """Clean and normalize PACS text for better matching (cached per text)"""
+    text = _CLEAN_RE.sub(lambda m: _CLEAN_MAP[m.group(0)], text.upper())
+    
+    # Collapse any run of whitespace left behind
+    return _WS_RE.sub(' ', text).strip()
+
+@functools.lru_cache(maxsize=8192)
+def _modality_of(words):
+    """Modality named in a word set, or None (cached per frozenset)"""
+    found = [_VARIANT_TO_MODALITY[word] for word in words if word in _VARIANT_TO_MODALITY]
+    return max(found)[1] if found else None
+
+@functools.lru_cache(maxsize=65536)
+def _fuzzy_match(proc_upper, line_upper, proc_words, line_words):
+    """Very strict matching for procedure names (cached, word sets must be frozensets)"""
+    # First try exact substring match (most reliable)
+    if proc_upper in line_upper:
+        return True
+    
+    # STRICT RULE 1: Modality must match exactly (cheap cached lookup, done first)
+    proc_modality = _modality_of(proc_words)
+    line_modality = _modality_of(line_words)
+    
+    # If modalities don't match, reject immediately
+    if proc_modality and line_modality and proc_modality != line_modality:
+        return False
+    
+    # STRICT RULE 2: Key anatomical words must match exactly
+    proc_anatomy = proc_words & _ANATOMY_WORDS
+    line_anatomy = line_words & _ANATOMY_WORDS
+    
+    # If procedure has anatomy, line must have EXACTLY the same anatomy
+    if proc_anatomy and proc_anatomy != line_anatomy:
+        return False
+    
+    # STRICT RULE 3: Contrast information must match
+    proc_contrast = set()
+    line_contrast = set()
+    
+    if 'WITH' in proc_words:
+        proc_contrast.add('WITH')
+    if 'WITHOUT' in proc_words or 'WO' in proc_words:
+        proc_contrast.add('WITHOUT')
+    if 'WITH' in line_words:
+        line_contrast.add('WITH')
+    if 'WITHOUT' in line_words or 'WO' in line_words:
+        line_contrast.add('WITHOUT')
+    
+    # If contrast specified, must match
+    if proc_contrast and line_contrast and not proc_contrast.intersection(line_contrast):
+        return False
+    
+    # STRICT RULE 4: All significant procedure words must be present
+    # Remove very common words that don't add specificity
+    significant_proc_words = proc_words - _COMMON_WORDS
+    significant_line_words = line_words - _COMMON_WORDS
+    
+    # At least 90% of significant procedure words must be in the line
+    if len(significant_proc_words) > 0:
+        matches = len(significant_proc_words.intersection(significant_line_words))
+        match_percentage = matches / len(significant_proc_words)
+        
+        if match_percentage < 0.9:
+            return False
+    
+    return True
 
 class SimpleWRVUCalculator:
     def __init__(self):
         self.setup_database()
+        self.setup_match_index()
         self.setup_generic_values()
+        self._ocr_cache = {}  # image content hash -> extracted text
         
     def setup_database(self):
         """Load procedure database from CSV file"""
@@ -44,19 +184,33 @@ class SimpleWRVUCalculator:
                 print("Please ensure procedure_database.csv is in the same directory as this script.")
                 sys.exit(1)
             
+            # csv.reader keeps pace with pandas.read_csv here since building the
+            # per-procedure dicts dominates, and it avoids importing pandas at startup
             with open(csv_file, 'r', newline='', encoding='utf-8') as file:
-                reader = csv.DictReader(file)
-                for row in reader:
-                    # Handle potential column name variations
-                    name = row.get('name') or row.get('procedure_name') or row.get('Procedure Name')
-                    cpt = row.get('cpt') or row.get('CPT') or row.get('cpt_code') or row.get('CPT Code')
-                    wrvu = row.get('wrvu') or row.get('WRVU') or row.get('wRVU') or row.get('wRVU Value')
-                    
-                    if name and cpt and wrvu:
-                        self.procedure_db[name.upper().strip()] = {
-                            "cpt": str(cpt).strip(),
-                            "wrvu": float(wrvu)
-                        }
+                reader = csv.reader(file)
+                header = next(reader, [])
+                
+                # Handle potential column name variations (resolved once from the header)
+                def find_column(*names):
+                    return next((header.index(n) for n in names if n in header), None)
+                
+                name_col = find_column('name', 'procedure_name', 'Procedure Name')
+                cpt_col = find_column('cpt', 'CPT', 'cpt_code', 'CPT Code')
+                wrvu_col = find_column('wrvu', 'WRVU', 'wRVU', 'wRVU Value')
+                
+                if None not in (name_col, cpt_col, wrvu_col):
+                    last_col = max(name_col, cpt_col, wrvu_col)
+                    for row in reader:
+                        # Comment / section rows are shorter than a procedure row
+                        if len(row) <= last_col:
+                            continue
+                        
+                        name, cpt, wrvu = row[name_col], row[cpt_col], row[wrvu_col]
+                        if name and cpt and wrvu:
+                            self.procedure_db[name.upper().strip()] = {
+                                "cpt": cpt.strip(),
+                                "wrvu": float(wrvu)
+                            }
             
             if len(self.procedure_db) == 0:
                 print("ERROR: No valid procedures found in CSV file!")
@@ -70,6 +224,30 @@ class SimpleWRVUCalculator:
             print("Please check that procedure_database.csv exists and is properly formatted.")
             sys.exit(1)
     
+    def setup_match_index(self):
+        """Index procedures by their significant words for fast candidate lookup"""
+        self._proc_tokens = {}
+        self._word_to_procs = {}
+        self._unindexed_procs = set()
+        
+        for name in self.procedure_db:
+            tokens = frozenset(_WORD_RE.findall(name)) - _COMMON_WORDS
+            self._proc_tokens[name] = tokens
+            for word in tokens:
+                self._word_to_procs.setdefault(word, set()).add(name)
+            
+            # A name can still match as a plain substring (e.g. "XR SKULL" inside
+            # "AXR SKULLS") without sharing a whole word with the line, unless one of
+            # its significant words sits between two separators - always check those
+            if not any(m.start() > 0 and m.end() < len(name) and m.group() not in _COMMON_WORDS
+                       for m in _WORD_RE.finditer(name)):
+                self._unindexed_procs.add(name)
+        
+        # Most specific procedures first (most words, then longest name), computed once
+        self._sorted_procs = sorted(self.procedure_db.keys(),
+                                    key=lambda name: (len(name.split()), len(name)), reverse=True)
+        self._proc_rank = {name: rank for rank, name in enumerate(self._sorted_procs)}
+    
     def setup_generic_values(self):
         """Generic wRVU values by modality"""
         self.generic_wrvus = {
@@ -88,76 +266,71 @@ class SimpleWRVUCalculator:
             "PROCEDURE": 1.0,
             "OTHER": 1.0
         }
+        
+        # Patterns identifying a modality when no exact procedure matched,
+        # the first modality listed wins
+        self.generic_patterns = {
+            'CT': ['CT ', 'COMPUTED'],
+            'MRI': ['MRI ', 'MR ', 'MAGNETIC'],
+            'US': ['US ', 'ULTRASOUND', 'ECHO', 'VASCULAR', 'DUPLEX'],
+            'XR': ['XR ', 'RADIOGRAPH'],
+            'MAMMOGRAPHY': ['MAMMO', 'BREAST', 'MG '],
+            'PET': ['PET', 'POSITRON'],
+            'NM': ['NM ', 'NUCLEAR', 'BONE SCAN', 'SPECT', 'LUNG SCAN', 'LIVER SCAN'],
+            'FL': ['FL ', 'FLUORO', 'FLUOROSCOPY', 'ESOPHAGRAM', 'BARIUM', 'UPPER GI', 'RETROGRADE'],
+            'ANGIO': ['ANGIO', 'ANGIOGRAM', 'ANGIOGRAPHY'],
+            'DXA': ['DXA', 'BONE DENSITY', 'DEXA'],
+            'IR': ['IR ', 'EMBOLIZATION', 'KYPHOPLASTY'],
+            'PROCEDURE': ['THORACENTESIS', 'PARACENTESIS']
+        }
+        
+        self._generic_automaton = None
+        if ahocorasick is not None:
+            self._generic_automaton = ahocorasick.Automaton()
+            for priority, (modality, patterns) in enumerate(self.generic_patterns.items()):
+                for pattern in patterns:
+                    if pattern not in self._generic_automaton:
+                        self._generic_automaton.add_word(pattern, (priority, modality))
+            self._generic_automaton.make_automaton()
     
     def preprocess_image(self, image):
         """Preprocess image to improve OCR accuracy"""
-        import numpy as np
-        
-        # Convert PIL to numpy array
-        img_array = np.array(image)
-        
-        # Convert to grayscale if needed
-        if len(img_array.shape) == 3:
-            # Convert RGB to grayscale
-            img_array = np.dot(img_array[...,:3], [0.2989, 0.5870, 0.1140])
-        
-        # Convert back to PIL
-        processed_image = Image.fromarray(img_array.astype('uint8'), 'L')
-        
-        return processed_image
+        # Grayscale with PIL's own ITU-R 601 luma conversion (no float64 copy)
+        return image.convert('L') if image.mode != 'L' else image
     
     def extract_text_from_image(self, image_path):
         """Extract text from image using best OCR method found"""
+        import pytesseract
+        from PIL import Image
+        
         try:
-            original_image = Image.open(image_path)
+            with open(image_path, 'rb') as file:
+                data = file.read()
+            
+            # Identical screenshot bytes give identical text, only OCR them once
+            key = hashlib.blake2b(data, digest_size=16).digest()
+            if key in self._ocr_cache:
+                return self._ocr_cache[key]
+            
+            original_image = Image.open(io.BytesIO(data))
+            # JPEGs can be decoded straight to grayscale (no-op for other formats)
+            original_image.draft('L', original_image.size)
             
             # Use the best method we found: Preprocessed + PSM 11
             processed_image = self.preprocess_image(original_image)
             text = pytesseract.image_to_string(processed_image, config='--psm 11')
             
+            self._ocr_cache[key] = text
             return text
             
+        except FileNotFoundError:
+            raise
         except Exception as e:
             raise Exception(f"Error processing {image_path}: {e}")
     
     def clean_pacs_text(self, text):
         """Clean and normalize PACS text for better matching"""
-        # Common PACS cleaning patterns
-        text = text.upper()
-        
-        # Replace common PACS abbreviations and clean formatting
-        replacements = {
-            'CR ': 'XR ',  # Computed Radiography = X-ray
-            'CR\t': 'XR ',
-            'RF ': 'FL ',  # Radiofluoroscopy = Fluoroscopy
-            'RF\t': 'FL ',
-            'XA ': 'ANGIO ',  # X-ray Angiography
-            'XA\t': 'ANGIO ',
-            'BD ': 'DXA ',  # Bone Density
-            'BD\t': 'DXA ',
-            'PT ': 'PET ',  # Positron Emission Tomography
-            'PT\t': 'PET ',
-            'MR ': 'MRI ',  # Magnetic Resonance
-            'MR\t': 'MRI ',
-            'DANGIO': 'DXA',  # OCR error fix
-            'MRIHIP': 'MRI HIP',  # OCR error fix
-            # Clean up formatting
-            '\t': ' ',     # Tabs to spaces
-            '_': ' ',      # Underscores to spaces
-            '—': ' ',      # Em dashes to spaces
-            '-': ' ',      # Hyphens to spaces
-            '  ': ' ',     # Double spaces to single
-            '   ': ' ',    # Triple spaces to single
-        }
-        
-        for old, new in replacements.items():
-            text = text.replace(old, new)
-        
-        # Clean up extra spaces
-        while '  ' in text:
-            text = text.replace('  ', ' ')
-        
-        return text.strip()
+        return _clean_pacs_text(text)
     
     def reconstruct_procedure_lines(self, text):
         """Reconstruct fragmented procedure lines from OCR output"""
@@ -172,7 +345,7 @@ class SimpleWRVUCalculator:
                 continue
                 
             # Date pattern indicates end of procedure line
-            if re.search(r'\d{1,2}-\w{3}-\d{4}', line):
+            if _DATE_RE.search(line):
                 if current_procedure:
                     # Add date/time to current procedure
                     reconstructed_lines.append(f"{current_procedure} {line}")
@@ -184,7 +357,7 @@ class SimpleWRVUCalculator:
             elif line.isdigit():
                 continue
             # Modality prefixes (US, CT, MR, etc.) start new procedures
-            elif re.match(r'^(US|CT|MR|XR|CR|RF|FL|PT|PET|BD|DXA|NM|IR)', line.upper()):
+            elif _MODALITY_RE.match(line.upper()):
                 if current_procedure:
                     # Save previous procedure if we have one
                     reconstructed_lines.append(current_procedure)
@@ -202,121 +375,71 @@ class SimpleWRVUCalculator:
         
         return reconstructed_lines
     
-    def fuzzy_match(self, proc_name, line):
-        """Very strict matching for procedure names"""
-        proc_upper = proc_name.upper().strip()
-        line_upper = line.upper().strip()
-        
-        # First try exact substring match (most reliable)
-        if proc_upper in line_upper:
-            return True
-        
+    def fuzzy_match(self, proc_name, line, proc_words=None, line_words=None):
+        """Very strict matching for procedure names
+        
+        Both names must already be upper-cased and stripped, as procedure_db keys
+        and clean_pacs_text output are. proc_words / line_words may be passed in
+        when the caller has already tokenized the inputs (as frozensets, common
+        words may be left out).
+        """
         # Extract words, keeping important short words
-        proc_words = set(re.findall(r'\b\w+\b', proc_upper))
-        line_words = set(re.findall(r'\b\w+\b', line_upper))
-        
-        # STRICT RULE 1: Modality must match exactly
-        modality_mapping = {
-            'XR': ['XR'],
-            'CT': ['CT'],
-            'MRI': ['MRI', 'MR'],
-            'US': ['US'],
-            'FL': ['FL'],
-            'PET': ['PET'],
-            'DXA': ['DXA'],
-            'NM': ['NM']
-        }
-        
-        proc_modality = None
-        line_modality = None
-        
-        for modality, variants in modality_mapping.items():
-            if any(variant in proc_words for variant in variants):
-                proc_modality = modality
-            if any(variant in line_words for variant in variants):
-                line_modality = modality
-        
-        # If modalities don't match, reject immediately
-        if proc_modality and line_modality and proc_modality != line_modality:
-            return False
-        
-        # STRICT RULE 2: Key anatomical words must match exactly
-        anatomy_words = {
-            'CHEST', 'ABDOMEN', 'PELVIS', 'HEAD', 'BRAIN', 'SPINE', 'LUMBAR', 'CERVICAL', 'THORACIC',
-            'KNEE', 'ANKLE', 'SHOULDER', 'ELBOW', 'HIP', 'FOOT', 'HAND', 'WRIST', 'NECK', 'ORBIT'
-        }
-        
-        proc_anatomy = proc_words.intersection(anatomy_words)
-        line_anatomy = line_words.intersection(anatomy_words)
-        
-        # If procedure has anatomy, line must have EXACTLY the same anatomy
-        if proc_anatomy and proc_anatomy != line_anatomy:
-            return False
-        
-        # STRICT RULE 3: Contrast information must match
-        proc_contrast = set()
-        line_contrast = set()
-        
-        if 'WITH' in proc_words:
-            proc_contrast.add('WITH')
-        if 'WITHOUT' in proc_words or 'WO' in proc_words:
-            proc_contrast.add('WITHOUT')
-        if 'WITH' in line_words:
-            line_contrast.add('WITH')
-        if 'WITHOUT' in line_words or 'WO' in line_words:
-            line_contrast.add('WITHOUT')
-        
-        # If contrast specified, must match
-        if proc_contrast and line_contrast and not proc_contrast.intersection(line_contrast):
-            return False
-        
-        # STRICT RULE 4: All significant procedure words must be present
-        # Remove very common words that don't add specificity
-        common_words = {'AND', 'OR', 'THE', 'OF', 'IN', 'ON', 'AT', 'TO', 'FOR', 'VIEW', 'VIEWS'}
-        significant_proc_words = proc_words - common_words
-        significant_line_words = line_words - common_words
+        if proc_words is None:
+            proc_words = frozenset(_WORD_RE.findall(proc_name))
+        if line_words is None:
+            line_words = frozenset(_WORD_RE.findall(line))
         
-        # At least 90% of significant procedure words must be in the line
-        if len(significant_proc_words) > 0:
-            matches = len(significant_proc_words.intersection(significant_line_words))
-            match_percentage = matches / len(significant_proc_words)
-            
-            if match_percentage < 0.9:
-                return False
-        
-        return True
+        return _fuzzy_match(proc_name, line, proc_words, line_words)
     
     def try_generic_match(self, line):
         """Try to match using generic modality patterns"""
         line_upper = line.upper()
         
-        modality_patterns = {
-            'CT': ['CT ', 'COMPUTED'],
-            'MRI': ['MRI ', 'MR ', 'MAGNETIC'],
-            'US': ['US ', 'ULTRASOUND', 'ECHO', 'VASCULAR', 'DUPLEX'],
-            'XR': ['XR ', 'RADIOGRAPH'],
-            'MAMMOGRAPHY': ['MAMMO', 'BREAST', 'MG '],
-            'PET': ['PET', 'POSITRON'],
-            'NM': ['NM ', 'NUCLEAR', 'BONE SCAN', 'SPECT', 'LUNG SCAN', 'LIVER SCAN'],
-            'FL': ['FL ', 'FLUORO', 'FLUOROSCOPY', 'ESOPHAGRAM', 'BARIUM', 'UPPER GI', 'RETROGRADE'],
-            'ANGIO': ['ANGIO', 'ANGIOGRAM', 'ANGIOGRAPHY'],
-            'DXA': ['DXA', 'BONE DENSITY', 'DEXA'],
-            'IR': ['IR ', 'EMBOLIZATION', 'KYPHOPLASTY'],
-            'PROCEDURE': ['THORACENTESIS', 'PARACENTESIS']
-        }
+        if self._generic_automaton is not None:
+            # Hits come back in line order, keep the highest priority modality
+            hits = [value for _, value in self._generic_automaton.iter(line_upper)]
+            return min(hits)[1] if hits else None
         
-        for modality, patterns in modality_patterns.items():
+        for modality, patterns in self.generic_patterns.items():
             if any(pattern in line_upper for pattern in patterns):
                 return modality
         
         return None
     
+    def match_cleaned_line(self, cleaned_line):
+        """Match one cleaned line, returns (procedure, is_generic) or (None, False)"""
+        # Only procedures sharing a significant word with the line can match
+        line_words = frozenset(_WORD_RE.findall(cleaned_line)) - _COMMON_WORDS
+        word_hits = Counter(chain.from_iterable(
+            self._word_to_procs.get(word, ()) for word in line_words))
+        candidates = self._unindexed_procs.union(word_hits)
+        
+        # Try exact matches first, in the precomputed most-specific-first order
+        # so the first hit is the best
+        for proc_name in sorted(candidates, key=self._proc_rank.__getitem__):
+            proc_words = self._proc_tokens[proc_name]
+            # Under 90% of the words shared can only match as a plain substring
+            if 10 * word_hits[proc_name] < 9 * len(proc_words) and proc_name not in cleaned_line:
+                continue
+            if self.fuzzy_match(proc_name, cleaned_line, proc_words, line_words):
+                return proc_name, False
+        
+        # Try generic match if no exact match
+        generic_modality = self.try_generic_match(cleaned_line)
+        if generic_modality:
+            return f"GENERIC {generic_modality}", True
+        
+        return None, False
+    
     def find_procedures_in_reconstructed_text(self, procedure_lines, source_file=""):
         """Find procedures in reconstructed text lines"""
         procedures = []
         unmatched_lines = []
         generic_lines = []
         
+        # Worklists repeat lines a lot, so each distinct cleaned line is matched once
+        line_matches = {}
+        
         for line_num, line in enumerate(procedure_lines, 1):
             if not line or len(line) < 5:
                 continue
@@ -324,58 +447,31 @@ class SimpleWRVUCalculator:
             # Clean PACS text
             cleaned_line = self.clean_pacs_text(line)
             
-            # Sort procedures by length (longest first) for better matching
-            sorted_procedures = sorted(self.procedure_db.keys(), key=len, reverse=True)
-            
-            # Try exact matches first
-            matched = False
-            best_match = None
-            best_match_score = 0
-            
-            for proc_name in sorted_procedures:
-                if self.fuzzy_match(proc_name, cleaned_line):
-                    match_score = len(proc_name.split())
-                    if match_score > best_match_score:
-                        best_match = proc_name
-                        best_match_score = match_score
-            
-            if best_match:
-                procedures.append({
-                    'procedure': best_match,
-                    'original_line': line,
-                    'cleaned_line': cleaned_line,
-                    'is_generic': False,
-                    'source': source_file
-                })
-                matched = True
-            
-            # Try generic match if no exact match
-            if not matched:
-                generic_modality = self.try_generic_match(cleaned_line)
-                if generic_modality:
-                    procedures.append({
-                        'procedure': f"GENERIC {generic_modality}",
-                        'original_line': line,
-                        'cleaned_line': cleaned_line,
-                        'is_generic': True,
-                        'source': source_file
-                    })
-                    generic_lines.append(cleaned_line)
-                    matched = True
+            if cleaned_line not in line_matches:
+                line_matches[cleaned_line] = self.match_cleaned_line(cleaned_line)
+            procedure, is_generic = line_matches[cleaned_line]
             
             # Track unmatched lines for debugging
-            if not matched:
+            if procedure is None:
                 unmatched_lines.append(cleaned_line)
+                continue
+            
+            procedures.append({
+                'procedure': procedure,
+                'original_line': line,
+                'cleaned_line': cleaned_line,
+                'is_generic': is_generic,
+                'source': source_file
+            })
+            if is_generic:
+                generic_lines.append(cleaned_line)
         
         return procedures, unmatched_lines, generic_lines
     
     def calculate_wrvus(self, procedures):
         """Calculate total wRVUs"""
         # Count procedures
-        procedure_counts = {}
-        for proc in procedures:
-            name = proc['procedure']
-            procedure_counts[name] = procedure_counts.get(name, 0) + 1
+        procedure_counts = Counter(proc['procedure'] for proc in procedures)
         
         results = []
         total_exams = 0
@@ -553,6 +649,8 @@ class WRVUCalculatorGUI:
     def check_clipboard(self):
         """Check if there's an image in clipboard and save it"""
         try:
+            from PIL import ImageGrab
+            
             img = ImageGrab.grabclipboard()
             if img:
                 timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -614,6 +712,9 @@ class WRVUCalculatorGUI:
         self.captured_images = []
         self.selected_files = []
         self.unmatched_procedures = []
+        _clean_pacs_text.cache_clear()
+        _fuzzy_match.cache_clear()
+        _modality_of.cache_clear()
         self.update_status()
         self.results_label.config(text="No calculations yet", foreground="black")
         self.unmatched_text.delete(1.0, tk.END)
@@ -635,38 +736,40 @@ class WRVUCalculatorGUI:
         thread.daemon = True
         thread.start()
     
+    def process_one_image(self, image_path):
+        """OCR and match a single image, returns (procedures, unmatched, generic)"""
+        try:
+            # Extract text
+            text = self.calculator.extract_text_from_image(image_path)
+            
+            if not text.strip():
+                return [], [], []
+            
+            # Reconstruct procedure lines
+            procedure_lines = self.calculator.reconstruct_procedure_lines(text)
+            
+            # Find procedures
+            return self.calculator.find_procedures_in_reconstructed_text(
+                procedure_lines, os.path.basename(image_path))
+            
+        except FileNotFoundError:
+            # Image was removed after it was selected
+            return [], [], []
+        except Exception as e:
+            # Skip failed images silently for clean output
+            return [], [], []
+    
     def calculate_thread(self, image_paths):
         """Calculate wRVUs in background thread"""
         try:
-            all_procedures = []
-            all_unmatched = []
-            all_generic = []
+            # Each OCR call waits on its own tesseract process, so a thread pool
+            # runs several images at once (results stay in image order)
+            with ThreadPoolExecutor(max_workers=min(8, os.cpu_count() or 1)) as executor:
+                image_results = list(executor.map(self.process_one_image, image_paths))
             
-            for image_path in image_paths:
-                if not os.path.exists(image_path):
-                    continue
-                
-                try:
-                    # Extract text
-                    text = self.calculator.extract_text_from_image(image_path)
-                    
-                    if not text.strip():
-                        continue
-                    
-                    # Reconstruct procedure lines
-                    procedure_lines = self.calculator.reconstruct_procedure_lines(text)
-                    
-                    # Find procedures
-                    procedures, unmatched, generic = self.calculator.find_procedures_in_reconstructed_text(
-                        procedure_lines, os.path.basename(image_path))
-                    
-                    all_procedures.extend(procedures)
-                    all_unmatched.extend(unmatched)
-                    all_generic.extend(generic)
-                    
-                except Exception as e:
-                    # Skip failed images silently for clean output
-                    continue
+            all_procedures = list(chain.from_iterable(r[0] for r in image_results))
+            all_unmatched = list(chain.from_iterable(r[1] for r in image_results))
+            all_generic = list(chain.from_iterable(r[2] for r in image_results))
             
             if not all_procedures:
                 self.update_gui_results("No procedures found", 0, 0.0, [], True)
@@ -4,6 +4,9 @@ import os
 import sys
 import json
 import re
+import functools
+from collections import Counter
+from itertools import chain
 from datetime import datetime
 import warnings
 warnings.filterwarnings("ignore", category=DeprecationWarning)
@@ -19,11 +22,174 @@ except ImportError as e:
     print("Please run: pip install pillow pytesseract pandas numpy")
     sys.exit(1)
 
+# Optional - finds every procedure name inside a line in a single pass
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+# Optional - keeps one Tesseract engine loaded across images instead of
+# starting a tesseract process per image through pytesseract
+try:
+    import tesserocr
+except ImportError:
+    tesserocr = None
+
+# Optional - evens out contrast of unevenly lit screenshots before OCR
+try:
+    import cv2
+except ImportError:
+    cv2 = None
+
+# Patterns used for every OCR line, compiled once
+_DATE_RE = re.compile(r'\d{1,2}-\w{3}-\d{4}')
+_MODALITY_PREFIX_RE = re.compile(r'^(US|CT|MR|XR|CR|RF|FL|PT|PET|BD|DXA|NM|IR)')
+_WORD_RE = re.compile(r'\b\w+\b')
+
+# PACS abbreviations and OCR fix-ups, applied by clean_pacs_text in one pass
+_SUB_MAP = {
+    'CR ': 'XR ',  # Computed Radiography = X-ray
+    'CR\t': 'XR ',
+    'RF ': 'FL ',  # Radiofluoroscopy = Fluoroscopy
+    'RF\t': 'FL ',
+    'XA ': 'ANGIO ',  # X-ray Angiography
+    'XA\t': 'ANGIO ',
+    'DXA ': 'DXA ',  # DXA itself must not be turned into D + ANGIO
+    'DXA\t': 'DXA ',
+    'BD ': 'DXA ',  # Bone Density
+    'BD\t': 'DXA ',
+    'PT ': 'PET ',  # Positron Emission Tomography
+    'PT\t': 'PET ',
+    'MR ': 'MRI ',  # Magnetic Resonance
+    'MR\t': 'MRI ',
+    'DANGIO': 'DXA',  # OCR error fix
+    'MRIHIP': 'MRI HIP',  # OCR error fix
+}
+# Longest keys first so the longest match wins at any position
+_SUB_RE = re.compile('|'.join(re.escape(k) for k in sorted(_SUB_MAP, key=len, reverse=True)))
+# Clean up formatting, after the abbreviations so "CR\t" is still seen as CR
+_CHAR_TRANS = str.maketrans({
+    '\t': ' ',     # Tabs to spaces
+    '_': ' ',      # Underscores to spaces
+    '—': ' ',      # Em dashes to spaces
+    '-': ' ',      # Hyphens to spaces
+})
+_WS_RE = re.compile(r'\s+')
+
+# Words too common to say anything about which procedure a line is
+_COMMON_WORDS = frozenset({'AND', 'OR', 'THE', 'OF', 'IN', 'ON', 'AT', 'TO', 'FOR', 'VIEW', 'VIEWS'})
+
+# Modality variants, in the order fuzzy_match resolves them (last one named wins)
+_MODALITY_MAPPING = (
+    ('XR', ('XR',)),
+    ('CT', ('CT',)),
+    ('MRI', ('MRI', 'MR')),
+    ('US', ('US',)),
+    ('FL', ('FL',)),
+    ('PET', ('PET',)),
+    ('DXA', ('DXA',)),
+    ('NM', ('NM',)),
+)
+
+# Modality keywords for lines with no database match, first modality found wins
+_GENERIC_MODALITY_PATTERNS = (
+    ('CT', ('CT ', 'COMPUTED')),
+    ('MRI', ('MRI ', 'MR ', 'MAGNETIC')),
+    ('US', ('US ', 'ULTRASOUND', 'ECHO', 'VASCULAR', 'DUPLEX')),
+    ('XR', ('XR ', 'RADIOGRAPH')),
+    ('MAMMOGRAPHY', ('MAMMO', 'BREAST', 'MG ')),
+    ('PET', ('PET', 'POSITRON')),
+    ('NM', ('NM ', 'NUCLEAR', 'BONE SCAN', 'SPECT', 'LUNG SCAN', 'LIVER SCAN')),
+    ('FL', ('FL ', 'FLUORO', 'FLUOROSCOPY', 'ESOPHAGRAM', 'BARIUM', 'UPPER GI', 'RETROGRADE')),
+    ('ANGIO', ('ANGIO', 'ANGIOGRAM', 'ANGIOGRAPHY')),
+    ('DXA', ('DXA', 'BONE DENSITY', 'DEXA')),
+    ('IR', ('IR ', 'EMBOLIZATION', 'KYPHOPLASTY')),
+    ('PROCEDURE', ('THORACENTESIS', 'PARACENTESIS')),
+)
+# One group per modality, so a single scan finds whether any keyword is present
+_GENERIC_MODALITY_RE = re.compile('|'.join(
+    f'(?P<{modality}>' + '|'.join(re.escape(pattern) for pattern in patterns) + ')'
+    for modality, patterns in _GENERIC_MODALITY_PATTERNS))
+
+# Key anatomical words a procedure and line must agree on exactly
+_ANATOMY_WORDS = frozenset({
+    'CHEST', 'ABDOMEN', 'PELVIS', 'HEAD', 'BRAIN', 'SPINE', 'LUMBAR', 'CERVICAL', 'THORACIC',
+    'KNEE', 'ANKLE', 'SHOULDER', 'ELBOW', 'HIP', 'FOOT', 'HAND', 'WRIST', 'NECK', 'ORBIT'
+})
+
+# OCR output repeats lines within and across screenshots, and every line is
+# compared with many procedures, so the pure text steps are cached per string
+@functools.lru_cache(maxsize=4096)
+def _clean_cached(text):
+    """Clean and normalize PACS text for better matching (cached per text)"""
+    text = _SUB_RE.sub(lambda m: _SUB_MAP[m.group(0)], text.upper()).translate(_CHAR_TRANS)
+    
+    # Collapse any run of whitespace left behind
+    return _WS_RE.sub(' ', text).strip()
+
+# Calculator of an OCR worker process, set once by _init_ocr_worker
+_worker_calculator = None
+
+def _init_ocr_worker(calculator):
+    """Keep the calculator sent to this worker for every image it OCRs"""
+    global _worker_calculator
+    _worker_calculator = calculator
+
+def _ocr_in_worker(image_path):
+    """OCR one image in a worker process"""
+    return _worker_calculator.extract_text_from_image(image_path)
+
 class SimpleWRVUCalculator:
-    def __init__(self):
+    def __init__(self, max_width=None):
+        # Screenshots wider than this are scaled down before OCR (None keeps them
+        # as captured, since small PACS fonts lose accuracy when shrunk)
+        self.max_width = max_width
+        self._tess_api = None
+        self._clahe = None
         self.setup_database()
+        self.setup_match_index()
         self.setup_generic_values()
-        
+    
+    def __getstate__(self):
+        """Drop the Tesseract handle and CLAHE object when pickling - each process makes its own"""
+        state = self.__dict__.copy()
+        state['_tess_api'] = None
+        state['_clahe'] = None
+        return state
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+    
+    def __del__(self):
+        self.close()
+    
+    def close(self):
+        """Release the Tesseract engine if one was opened"""
+        api = getattr(self, '_tess_api', None)
+        if api:
+            api.End()
+        self._tess_api = None
+    
+    def get_tesseract_api(self):
+        """Open the tesserocr engine once and reuse it for every image"""
+        if self._tess_api is None and tesserocr is not None:
+            try:
+                self._tess_api = tesserocr.PyTessBaseAPI(psm=tesserocr.PSM.SPARSE_TEXT)
+            except RuntimeError as e:
+                # No usable tessdata for the C API - stay on pytesseract
+                print(f"tesserocr unavailable ({e}), using pytesseract")
+                self._tess_api = False
+        return self._tess_api
+        
+    def get_clahe(self):
+        """Create OpenCV's adaptive histogram equalizer once and reuse it"""
+        if self._clahe is None:
+            self._clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
+        return self._clahe
+    
     def setup_database(self):
         """Load procedure database from CSV file"""
         self.procedure_db = {}
@@ -45,7 +211,8 @@ class SimpleWRVUCalculator:
                     cpt = row.get('cpt') or row.get('CPT') or row.get('cpt_code') or row.get('CPT Code')
                     wrvu = row.get('wrvu') or row.get('WRVU') or row.get('wRVU') or row.get('wRVU Value')                    
                     if name and cpt and wrvu:
-                        self.procedure_db[name.upper().strip()] = {
+                        # Interned so every index, match and count shares one string per name
+                        self.procedure_db[sys.intern(name.upper().strip())] = {
                             "cpt": str(cpt).strip(),
                             "wrvu": float(wrvu)
                         }
@@ -55,6 +222,12 @@ class SimpleWRVUCalculator:
                 print("Please check the CSV format and column names.")
                 sys.exit(1)
             
+            # Column layout for pricing: row index per name, wRVU and CPT per row
+            self._proc_rows = {name: row for row, name in enumerate(self.procedure_db)}
+            self._wrvu = np.fromiter((entry["wrvu"] for entry in self.procedure_db.values()),
+                                     dtype=np.float64, count=len(self.procedure_db))
+            self._cpt = np.array([entry["cpt"] for entry in self.procedure_db.values()], dtype=object)
+            
             print(f"Loaded {len(self.procedure_db)} procedures from {csv_file}")
                 
         except Exception as e:
@@ -62,6 +235,93 @@ class SimpleWRVUCalculator:
             print("Please check that procedure_database.csv exists and is properly formatted.")
             sys.exit(1)
     
+    def setup_match_index(self):
+        """Index procedures for fast candidate lookup"""
+        # fuzzy_match's rules work on word bitmaps: every word of a procedure name
+        # (plus the anatomy, contrast and modality words) gets one bit of an int,
+        # and everything the rules need from a procedure is derived here once
+        self._word_bits = {}
+        for word in chain(sorted(_ANATOMY_WORDS), sorted(_COMMON_WORDS), ('WITH', 'WITHOUT', 'WO'),
+                          chain.from_iterable(variants for _, variants in _MODALITY_MAPPING)):
+            self._word_bits.setdefault(word, 1 << len(self._word_bits))
+        self._anatomy_mask = self._word_mask(_ANATOMY_WORDS)
+        self._common_mask = self._word_mask(_COMMON_WORDS)
+        self._with_mask = self._word_mask(('WITH',))
+        self._without_mask = self._word_mask(('WITHOUT', 'WO'))
+        # Last one named wins, so resolve from the end of the mapping. The procedure
+        # side is resolved once here; for lines, ANDing the bitmap with these eight
+        # masks beats looking every token up in a variant -> modality dict
+        self._modality_masks = tuple((name, self._word_mask(variants))
+                                     for name, variants in reversed(_MODALITY_MAPPING))
+        self._proc_bits = {name: self._text_bits(name, add_words=True) for name in self.procedure_db}
+        
+        # fuzzy_match needs 90% of a procedure's significant words in the line, so
+        # apart from plain substring hits only procedures sharing one can match.
+        # Postings are split by procedure modality, which must agree with the line's
+        self._token_index = {}
+        self._proc_word_counts = {}
+        self._wordless_procs = set()
+        for name in self.procedure_db:
+            tokens = set(_WORD_RE.findall(name)) - _COMMON_WORDS
+            self._proc_word_counts[name] = len(tokens)
+            modality = self._proc_bits[name][1]
+            for token in tokens:
+                self._token_index.setdefault(token, {}).setdefault(modality, set()).add(name)
+            if not tokens:
+                self._wordless_procs.add(name)
+        
+        # A name inside the line as a plain substring always matches, even without
+        # sharing a whole word with it (e.g. "XR SKULL" in "AXR SKULLS")
+        self._name_automaton = None
+        self._unindexed_procs = set()
+        if ahocorasick is not None:
+            self._name_automaton = ahocorasick.Automaton()
+            for name in self.procedure_db:
+                self._name_automaton.add_word(name, name)
+            self._name_automaton.make_automaton()
+        else:
+            # Without the automaton, always check the names that can match that way:
+            # those without a significant word between two separators
+            for name in self.procedure_db:
+                if not any(m.start() > 0 and m.end() < len(name) and m.group() not in _COMMON_WORDS
+                           for m in _WORD_RE.finditer(name)):
+                    self._unindexed_procs.add(name)
+        
+        # Longest names first for better matching, sorted once instead of per line
+        self._sorted_procedures = sorted(self.procedure_db.keys(), key=len, reverse=True)
+        self._proc_rank = {name: rank for rank, name in enumerate(self._sorted_procedures)}
+        # Best match is the one with the most words, counted once per name
+        self._match_scores = {name: len(name.split()) for name in self.procedure_db}
+    
+    def _word_mask(self, words, add_words=False):
+        """Bitmap of words; unknown words get a new bit only if add_words is set"""
+        mask = 0
+        for word in words:
+            bit = self._word_bits.get(word)
+            if bit is None:
+                if not add_words:
+                    # No procedure has this word, so no rule can depend on it
+                    continue
+                bit = self._word_bits[word] = 1 << len(self._word_bits)
+            mask |= bit
+        return mask
+    
+    def _text_bits(self, text, add_words=False):
+        """(word bitmap, modality, contrast bits, anatomy bitmap, significant word
+        bitmap, significant word count) of an upper-cased string"""
+        words = self._word_mask(_WORD_RE.findall(text), add_words)
+        
+        modality = None
+        for name, modality_mask in self._modality_masks:
+            if words & modality_mask:
+                modality = name
+                break
+        
+        # Bit 1 = WITH, bit 2 = WITHOUT / WO
+        contrast = (1 if words & self._with_mask else 0) | (2 if words & self._without_mask else 0)
+        significant = words & ~self._common_mask
+        return words, modality, contrast, words & self._anatomy_mask, significant, significant.bit_count()
+    
     def setup_generic_values(self):
         """Generic wRVU values by modality"""
         self.generic_wrvus = {
@@ -83,20 +343,19 @@ class SimpleWRVUCalculator:
     
     def preprocess_image(self, image):
         """Preprocess image to improve OCR accuracy"""
-        import numpy as np
+        # PIL converts to grayscale in C with integer BT.601 weights, no float copy
+        image = image.convert('L') if image.mode != 'L' else image
         
-        # Convert PIL to numpy array
-        img_array = np.array(image)
+        # Tesseract's cost grows with the pixel count
+        if self.max_width and image.width > self.max_width:
+            height = max(1, image.height * self.max_width // image.width)
+            image = image.resize((self.max_width, height), Image.LANCZOS)
         
-        # Convert to grayscale if needed
-        if len(img_array.shape) == 3:
-            # Convert RGB to grayscale
-            img_array = np.dot(img_array[...,:3], [0.2989, 0.5870, 0.1140])
+        # Adaptive histogram equalization (CLAHE) lifts text on dark, unevenly lit PACS screens
+        if cv2 is not None:
+            image = Image.fromarray(self.get_clahe().apply(np.asarray(image)), 'L')
         
-        # Convert back to PIL
-        processed_image = Image.fromarray(img_array.astype('uint8'), 'L')
-        
-        return processed_image
+        return image
     
     def extract_text_from_image(self, image_path):
         """Extract text from image using best OCR method found"""
@@ -106,7 +365,12 @@ class SimpleWRVUCalculator:
             
             # Use the best method we found: Preprocessed + PSM 11
             processed_image = self.preprocess_image(original_image)
-            text = pytesseract.image_to_string(processed_image, config='--psm 11')
+            api = self.get_tesseract_api()
+            if api:
+                api.SetImage(processed_image)
+                text = api.GetUTF8Text()
+            else:
+                text = pytesseract.image_to_string(processed_image, config='--psm 11')
             
             # print(f"OCR extracted {len(text)} characters, {len(text.splitlines())} lines")
             return text
@@ -115,48 +379,35 @@ class SimpleWRVUCalculator:
             print(f"Error processing {image_path}: {e}")
             return ""
     
+    def iter_texts_in_parallel(self, image_paths):
+        """OCR images across worker processes, yields their texts in order"""
+        from concurrent.futures import ProcessPoolExecutor
+        
+        workers = min(len(image_paths), os.cpu_count() or 1)
+        done = 0
+        if workers > 1:
+            try:
+                # The calculator is sent once per worker, not once per image
+                with ProcessPoolExecutor(max_workers=workers, initializer=_init_ocr_worker,
+                                         initargs=(self,)) as executor:
+                    for text in executor.map(_ocr_in_worker, image_paths):
+                        yield text
+                        done += 1
+            except Exception:
+                # No usable worker processes - OCR the rest here
+                pass
+        
+        for image_path in image_paths[done:]:
+            yield self.extract_text_from_image(image_path)
+    
     def clean_pacs_text(self, text):
         """Clean and normalize PACS text for better matching"""
-        # Common PACS cleaning patterns
-        text = text.upper()
-        
-        # Replace common PACS abbreviations and clean formatting
-        replacements = {
-            'CR ': 'XR ',  # Computed Radiography = X-ray
-            'CR\t': 'XR ',
-            'RF ': 'FL ',  # Radiofluoroscopy = Fluoroscopy
-            'RF\t': 'FL ',
-            'XA ': 'ANGIO ',  # X-ray Angiography
-            'XA\t': 'ANGIO ',
-            'BD ': 'DXA ',  # Bone Density
-            'BD\t': 'DXA ',
-            'PT ': 'PET ',  # Positron Emission Tomography
-            'PT\t': 'PET ',
-            'MR ': 'MRI ',  # Magnetic Resonance
-            'MR\t': 'MRI ',
-            'DANGIO': 'DXA',  # OCR error fix
-            'MRIHIP': 'MRI HIP',  # OCR error fix
-            # Clean up formatting
-            '\t': ' ',     # Tabs to spaces
-            '_': ' ',      # Underscores to spaces
-            '—': ' ',      # Em dashes to spaces
-            '-': ' ',      # Hyphens to spaces
-            '  ': ' ',     # Double spaces to single
-            '   ': ' ',    # Triple spaces to single
-        }
-        
-        for old, new in replacements.items():
-            text = text.replace(old, new)
-        
-        # Clean up extra spaces
-        while '  ' in text:
-            text = text.replace('  ', ' ')
-        
-        return text.strip()
+        return _clean_cached(text)
     
     def reconstruct_procedure_lines(self, text):
         """Reconstruct fragmented procedure lines from OCR output"""
-        lines = [line.strip() for line in text.splitlines() if line.strip()]
+        # Strip each line once, dropping the empty ones
+        lines = list(filter(None, map(str.strip, text.splitlines())))
         
         reconstructed_lines = []
         current_procedure = ""
@@ -166,8 +417,9 @@ class SimpleWRVUCalculator:
             if len(line) < 3:
                 continue
                 
-            # Date pattern indicates end of procedure line
-            if re.search(r'\d{1,2}-\w{3}-\d{4}', line):
+            # Date pattern indicates end of procedure line (dates always contain
+            # a hyphen, so most lines skip the regex scan)
+            if '-' in line and _DATE_RE.search(line):
                 if current_procedure:
                     # Add date/time to current procedure
                     reconstructed_lines.append(f"{current_procedure} {line}")
@@ -178,8 +430,9 @@ class SimpleWRVUCalculator:
             # Number-only lines are usually counts, skip them
             elif line.isdigit():
                 continue
-            # Modality prefixes (US, CT, MR, etc.) start new procedures
-            elif re.match(r'^(US|CT|MR|XR|CR|RF|FL|PT|PET|BD|DXA|NM|IR)', line.upper()):
+            # Modality prefixes (US, CT, MR, etc.) start new procedures, the
+            # longest is 3 characters so only those need upper-casing
+            elif _MODALITY_PREFIX_RE.match(line[:3].upper()):
                 if current_procedure:
                     # Save previous procedure if we have one
                     reconstructed_lines.append(current_procedure)
@@ -207,75 +460,34 @@ class SimpleWRVUCalculator:
         if proc_upper in line_upper:
             return True
         
-        # Extract words, keeping important short words
-        proc_words = set(re.findall(r'\b\w+\b', proc_upper))
-        line_words = set(re.findall(r'\b\w+\b', line_upper))
+        proc_bits = self._proc_bits.get(proc_upper) or self._text_bits(proc_upper, add_words=True)
+        return self._match_bits(proc_bits, self._text_bits(line_upper))
+    
+    def _match_bits(self, proc_bits, line_bits):
+        """fuzzy_match's strict rules on word bitmaps (substring check already done)"""
+        _, proc_modality, proc_contrast, proc_anatomy, significant_proc_words, significant_count = proc_bits
+        line_words, line_modality, line_contrast, line_anatomy = line_bits[:4]
         
         # STRICT RULE 1: Modality must match exactly
-        modality_mapping = {
-            'XR': ['XR'],
-            'CT': ['CT'],
-            'MRI': ['MRI', 'MR'],
-            'US': ['US'],
-            'FL': ['FL'],
-            'PET': ['PET'],
-            'DXA': ['DXA'],
-            'NM': ['NM']
-        }
-        
-        proc_modality = None
-        line_modality = None
-        
-        for modality, variants in modality_mapping.items():
-            if any(variant in proc_words for variant in variants):
-                proc_modality = modality
-            if any(variant in line_words for variant in variants):
-                line_modality = modality
-        
         # If modalities don't match, reject immediately
         if proc_modality and line_modality and proc_modality != line_modality:
             return False
         
         # STRICT RULE 2: Key anatomical words must match exactly
-        anatomy_words = {
-            'CHEST', 'ABDOMEN', 'PELVIS', 'HEAD', 'BRAIN', 'SPINE', 'LUMBAR', 'CERVICAL', 'THORACIC',
-            'KNEE', 'ANKLE', 'SHOULDER', 'ELBOW', 'HIP', 'FOOT', 'HAND', 'WRIST', 'NECK', 'ORBIT'
-        }
-        
-        proc_anatomy = proc_words.intersection(anatomy_words)
-        line_anatomy = line_words.intersection(anatomy_words)
-        
         # If procedure has anatomy, line must have EXACTLY the same anatomy
         if proc_anatomy and proc_anatomy != line_anatomy:
             return False
         
         # STRICT RULE 3: Contrast information must match
-        proc_contrast = set()
-        line_contrast = set()
-        
-        if 'WITH' in proc_words:
-            proc_contrast.add('WITH')
-        if 'WITHOUT' in proc_words or 'WO' in proc_words:
-            proc_contrast.add('WITHOUT')
-        if 'WITH' in line_words:
-            line_contrast.add('WITH')
-        if 'WITHOUT' in line_words or 'WO' in line_words:
-            line_contrast.add('WITHOUT')
-        
         # If contrast specified, must match
-        if proc_contrast and line_contrast and not proc_contrast.intersection(line_contrast):
+        if proc_contrast and line_contrast and not proc_contrast & line_contrast:
             return False
         
         # STRICT RULE 4: All significant procedure words must be present
-        # Remove very common words that don't add specificity
-        common_words = {'AND', 'OR', 'THE', 'OF', 'IN', 'ON', 'AT', 'TO', 'FOR', 'VIEW', 'VIEWS'}
-        significant_proc_words = proc_words - common_words
-        significant_line_words = line_words - common_words
-        
         # At least 90% of significant procedure words must be in the line
-        if len(significant_proc_words) > 0:
-            matches = len(significant_proc_words.intersection(significant_line_words))
-            match_percentage = matches / len(significant_proc_words)
+        if significant_count:
+            matches = (significant_proc_words & line_words).bit_count()
+            match_percentage = matches / significant_count
             
             if match_percentage < 0.9:
                 return False
@@ -286,26 +498,15 @@ class SimpleWRVUCalculator:
         """Try to match using generic modality patterns"""
         line_upper = line.upper()
         
-        modality_patterns = {
-            'CT': ['CT ', 'COMPUTED'],
-            'MRI': ['MRI ', 'MR ', 'MAGNETIC'],
-            'US': ['US ', 'ULTRASOUND', 'ECHO', 'VASCULAR', 'DUPLEX'],
-            'XR': ['XR ', 'RADIOGRAPH'],
-            'MAMMOGRAPHY': ['MAMMO', 'BREAST', 'MG '],
-            'PET': ['PET', 'POSITRON'],
-            'NM': ['NM ', 'NUCLEAR', 'BONE SCAN', 'SPECT', 'LUNG SCAN', 'LIVER SCAN'],
-            'FL': ['FL ', 'FLUORO', 'FLUOROSCOPY', 'ESOPHAGRAM', 'BARIUM', 'UPPER GI', 'RETROGRADE'],
-            'ANGIO': ['ANGIO', 'ANGIOGRAM', 'ANGIOGRAPHY'],
-            'DXA': ['DXA', 'BONE DENSITY', 'DEXA'],
-            'IR': ['IR ', 'EMBOLIZATION', 'KYPHOPLASTY'],
-            'PROCEDURE': ['THORACENTESIS', 'PARACENTESIS']
-        }
+        match = _GENERIC_MODALITY_RE.search(line_upper)
+        if not match:
+            return None
         
-        for modality, patterns in modality_patterns.items():
-            if any(pattern in line_upper for pattern in patterns):
+        # The leftmost pattern may belong to a later modality, and the first
+        # modality in table order wins, so check the ones before it
+        for modality, patterns in _GENERIC_MODALITY_PATTERNS:
+            if modality == match.lastgroup or any(pattern in line_upper for pattern in patterns):
                 return modality
-        
-        return None
     
     def find_procedures_in_reconstructed_text(self, procedure_lines, source_file=""):
         """Find procedures in reconstructed text lines with simplified debug output"""
@@ -322,8 +523,33 @@ class SimpleWRVUCalculator:
             # Clean PACS text
             cleaned_line = self.clean_pacs_text(line)
             
-            # Sort procedures by length (longest first) for better matching
-            sorted_procedures = sorted(self.procedure_db.keys(), key=len, reverse=True)
+            # fuzzy_match needs 90% of a procedure's significant words in the line
+            # unless the whole name is in it, so count shared words per procedure
+            # and only keep those reaching that, or found in the line as a substring
+            line_bits = self._text_bits(cleaned_line)
+            line_modality = line_bits[1]
+            postings = [self._token_index[word] for word in set(_WORD_RE.findall(cleaned_line))
+                        if word in self._token_index]
+            if line_modality and self._name_automaton is not None:
+                # Procedures of another modality only match as a substring of the
+                # line, and the automaton below finds every one of those
+                word_hits = Counter(chain.from_iterable(
+                    by_modality[modality] for by_modality in postings
+                    for modality in (line_modality, None) if modality in by_modality))
+            else:
+                word_hits = Counter(chain.from_iterable(
+                    names for by_modality in postings for names in by_modality.values()))
+            candidates = {name for name, hits in word_hits.items()
+                          if not hits / self._proc_word_counts[name] < 0.9}
+            candidates |= self._wordless_procs
+            if self._name_automaton is not None:
+                candidates.update(name for _, name in self._name_automaton.iter(cleaned_line))
+            else:
+                candidates.update(name for name in word_hits if name in cleaned_line)
+                candidates |= self._unindexed_procs
+            
+            # Longest first for better matching
+            sorted_procedures = sorted(candidates, key=self._proc_rank.__getitem__)
             
             # Try exact matches first
             matched = False
@@ -331,8 +557,9 @@ class SimpleWRVUCalculator:
             best_match_score = 0
             
             for proc_name in sorted_procedures:
-                if self.fuzzy_match(proc_name, cleaned_line):
-                    match_score = len(proc_name.split())
+                # Same as fuzzy_match; names and cleaned lines are already upper-cased
+                if proc_name in cleaned_line or self._match_bits(self._proc_bits[proc_name], line_bits):
+                    match_score = self._match_scores[proc_name]
                     if match_score > best_match_score:
                         best_match = proc_name
                         best_match_score = match_score
@@ -352,7 +579,7 @@ class SimpleWRVUCalculator:
                 generic_modality = self.try_generic_match(cleaned_line)
                 if generic_modality:
                     procedures.append({
-                        'procedure': f"GENERIC {generic_modality}",
+                        'procedure': sys.intern(f"GENERIC {generic_modality}"),
                         'original_line': line,
                         'cleaned_line': cleaned_line,
                         'is_generic': True,
@@ -396,34 +623,41 @@ class SimpleWRVUCalculator:
     
     def calculate_wrvus(self, procedures):
         """Calculate total wRVUs"""
-        # Count procedures
-        procedure_counts = {}
-        for proc in procedures:
-            name = proc['procedure']
-            procedure_counts[name] = procedure_counts.get(name, 0) + 1
+        names = [proc['procedure'] for proc in procedures]
+        
+        # Database procedures are counted by their row in the wRVU / CPT columns,
+        # generic estimates by name
+        rows = np.fromiter((self._proc_rows[name] for name in names if not name.startswith("GENERIC")),
+                           dtype=np.intp)
+        row_counts = np.bincount(rows, minlength=len(self._wrvu))
+        row_totals = self._wrvu * row_counts
+        generic_counts = Counter(name for name in names if name.startswith("GENERIC"))
         
         results = []
-        total_exams = 0
-        total_wrvus = 0.0
+        total_exams = len(names)
+        # Database wRVUs come out of a single reduction; generics are added below
+        total_wrvus = float(row_totals.sum())
         generic_count = 0
         
-        for proc_name, count in procedure_counts.items():
+        # Results in first-seen order
+        for proc_name in dict.fromkeys(names):
             if proc_name.startswith("GENERIC"):
+                count = generic_counts[proc_name]
                 modality = proc_name.replace("GENERIC ", "")
                 wrvu_each = self.generic_wrvus.get(modality, 1.0)
+                total_proc_wrvu = wrvu_each * count
                 cpt = "GENERIC"
                 generic_count += count
+                total_wrvus += total_proc_wrvu
                 is_generic = True
             else:
-                proc_data = self.procedure_db[proc_name]
-                wrvu_each = proc_data["wrvu"]
-                cpt = proc_data["cpt"]
+                row = self._proc_rows[proc_name]
+                count = int(row_counts[row])
+                wrvu_each = float(self._wrvu[row])
+                total_proc_wrvu = float(row_totals[row])
+                cpt = self._cpt[row]
                 is_generic = False
             
-            total_proc_wrvu = wrvu_each * count
-            total_wrvus += total_proc_wrvu
-            total_exams += count
-            
             results.append({
                 'procedure': proc_name,
                 'count': count,
@@ -450,15 +684,19 @@ class SimpleWRVUCalculator:
         print(f"Processing {len(image_paths)} image(s)...")
         all_procedures = []
         
-        for i, image_path in enumerate(image_paths, 1):
-            if not os.path.exists(image_path):
+        # OCR runs in worker processes while earlier images are matched here
+        found = [os.path.exists(image_path) for image_path in image_paths]
+        texts = self.iter_texts_in_parallel([path for path, exists in zip(image_paths, found) if exists])
+        
+        for i, (image_path, exists) in enumerate(zip(image_paths, found), 1):
+            if not exists:
                 print(f"File not found: {image_path}")
                 continue
             
             print(f"\nIMAGE {i}: {os.path.basename(image_path)}")
             
             # Extract text (suppress detailed OCR output)
-            text = self.extract_text_from_image(image_path)
+            text = next(texts)
             
             if not text.strip():
                 print("ERROR: No text extracted")
@@ -4,6 +4,8 @@ import os
 import sys
 import json
 import re
+import functools
+from collections import Counter, defaultdict, namedtuple
 from datetime import datetime
 import warnings
 warnings.filterwarnings("ignore", category=DeprecationWarning)
@@ -11,19 +13,206 @@ warnings.filterwarnings("ignore", category=DeprecationWarning)
 try:
     import pytesseract
     from PIL import Image
-    import numpy as np
     DEPENDENCIES_OK = True
 except ImportError as e:
     DEPENDENCIES_OK = False
     print(f"Missing dependencies: {e}")
-    print("Please run: pip install pillow pytesseract pandas numpy")
+    print("Please run: pip install pillow pytesseract")
     sys.exit(1)
 
+# Patterns used for every OCR line / procedure comparison, compiled once
+_DATE_RE = re.compile(r'\d{1,2}-\w{3}-\d{4}')
+_MODALITY_PREFIX_RE = re.compile(r'^(US|CT|MR|XR|CR|RF|FL|PT|PET|BD|DXA|NM|IR)')
+_WORD_RE = re.compile(r'\b\w+\b')
+
+# PACS abbreviations and OCR fix-ups, applied by clean_pacs_text in one pass
+_REPLACEMENTS = {
+    'CR ': 'XR ',  # Computed Radiography = X-ray
+    'CR\t': 'XR ',
+    'RF ': 'FL ',  # Radiofluoroscopy = Fluoroscopy
+    'RF\t': 'FL ',
+    'XA ': 'ANGIO ',  # X-ray Angiography
+    'XA\t': 'ANGIO ',
+    'DXA ': 'DXA ',  # DXA itself must not be turned into D + ANGIO
+    'DXA\t': 'DXA ',
+    'BD ': 'DXA ',  # Bone Density
+    'BD\t': 'DXA ',
+    'PT ': 'PET ',  # Positron Emission Tomography
+    'PT\t': 'PET ',
+    'MR ': 'MRI ',  # Magnetic Resonance
+    'MR\t': 'MRI ',
+    'DANGIO': 'DXA',  # OCR error fix
+    'MRIHIP': 'MRI HIP',  # OCR error fix
+}
+# Longest keys first so the longest match wins at any position
+_REPLACE_RE = re.compile('|'.join(re.escape(k) for k in sorted(_REPLACEMENTS, key=len, reverse=True)))
+_WS_RE = re.compile(r'\s+')
+# Single characters that just become spaces, applied after the table so that
+# e.g. "CR-SPINE" is not read as "CR SPINE"
+_PUNCT_TO_SPACE = str.maketrans({
+    '_': ' ',   # Underscores to spaces
+    '—': ' ',   # Em dashes to spaces
+    '-': ' ',   # Hyphens to spaces
+})
+
+# Modality variants, in the order fuzzy_match resolves them (last one named wins)
+_MODALITY_MAPPING = (
+    ('XR', frozenset({'XR'})),
+    ('CT', frozenset({'CT'})),
+    ('MRI', frozenset({'MRI', 'MR'})),
+    ('US', frozenset({'US'})),
+    ('FL', frozenset({'FL'})),
+    ('PET', frozenset({'PET'})),
+    ('DXA', frozenset({'DXA'})),
+    ('NM', frozenset({'NM'})),
+)
+
+# Substrings that identify a modality for a generic match, first modality wins
+_GENERIC_MODALITY_PATTERNS = (
+    ('CT', ('CT ', 'COMPUTED')),
+    ('MRI', ('MRI ', 'MR ', 'MAGNETIC')),
+    ('US', ('US ', 'ULTRASOUND', 'ECHO', 'VASCULAR', 'DUPLEX')),
+    ('XR', ('XR ', 'RADIOGRAPH')),
+    ('MAMMOGRAPHY', ('MAMMO', 'BREAST', 'MG ')),
+    ('PET', ('PET', 'POSITRON')),
+    ('NM', ('NM ', 'NUCLEAR', 'BONE SCAN', 'SPECT', 'LUNG SCAN', 'LIVER SCAN')),
+    ('FL', ('FL ', 'FLUORO', 'FLUOROSCOPY', 'ESOPHAGRAM', 'BARIUM', 'UPPER GI', 'RETROGRADE')),
+    ('ANGIO', ('ANGIO', 'ANGIOGRAM', 'ANGIOGRAPHY')),
+    ('DXA', ('DXA', 'BONE DENSITY', 'DEXA')),
+    ('IR', ('IR ', 'EMBOLIZATION', 'KYPHOPLASTY')),
+    ('PROCEDURE', ('THORACENTESIS', 'PARACENTESIS')),
+)
+_GENERIC_MODALITY_RE = re.compile('|'.join(
+    '(' + '|'.join(re.escape(pattern) for pattern in patterns) + ')'
+    for _, patterns in _GENERIC_MODALITY_PATTERNS))
+
+# Key anatomical words a procedure and line must agree on exactly
+_ANATOMY_WORDS = frozenset({
+    'CHEST', 'ABDOMEN', 'PELVIS', 'HEAD', 'BRAIN', 'SPINE', 'LUMBAR', 'CERVICAL', 'THORACIC',
+    'KNEE', 'ANKLE', 'SHOULDER', 'ELBOW', 'HIP', 'FOOT', 'HAND', 'WRIST', 'NECK', 'ORBIT'
+})
+
+# Words too common to say anything about which procedure a line is
+_COMMON_WORDS = frozenset({'AND', 'OR', 'THE', 'OF', 'IN', 'ON', 'AT', 'TO', 'FOR', 'VIEW', 'VIEWS'})
+
+# Grayscale range below which a screenshot cannot hold legible text, so OCR is
+# skipped (any real text is far more than this darker / lighter than its background)
+_MIN_TEXT_CONTRAST = 32
+
+# Parsed database and match index are pickled next to the CSV, bump the
+# version whenever what is cached changes shape
+_DB_CACHE_FILE = "procedure_database.pkl"
+_DB_CACHE_VERSION = 3
+_DB_CACHE_ATTRIBUTES = ('procedure_db', '_proc_features', '_token_index', '_unindexed_procs',
+                        '_sorted_names_by_len', '_name_rank')
+
+# One procedure_db entry, a tuple is far smaller than a dict per procedure
+ProcEntry = namedtuple('ProcEntry', ['cpt', 'wrvu'])
+
+# What fuzzy_match compares, worked out once per cleaned line / procedure.
+# min_line_len is the shortest line that could hold enough of the procedure's
+# significant words to pass the 90% rule.
+LineFeatures = namedtuple('LineFeatures', 'text words significant_words anatomy modality contrast')
+ProcFeatures = namedtuple('ProcFeatures', LineFeatures._fields + ('min_line_len',))
+
+def _min_line_len(significant_words):
+    """Shortest line that can contain 90% of these words, as separate words"""
+    if not significant_words:
+        return 0
+    
+    # Fewest words passing the same check fuzzy_match applies
+    count = len(significant_words)
+    needed = next(m for m in range(count + 1) if not m / count < 0.9)
+    shortest = sorted(map(len, significant_words))[:needed]
+    return sum(shortest) + needed - 1
+
+# Worklists repeat lines within and across screenshots, so both steps below
+# are cached per distinct line
+@functools.lru_cache(maxsize=4096)
+def _clean_pacs_text(text):
+    """Clean and normalize PACS text for better matching (cached per text)"""
+    text = _REPLACE_RE.sub(lambda m: _REPLACEMENTS[m.group(0)], text.upper())
+    text = text.translate(_PUNCT_TO_SPACE)
+    
+    # Collapse any run of whitespace (tabs included) to a single space
+    return _WS_RE.sub(' ', text).strip()
+
+@functools.lru_cache(maxsize=4096)
+def _line_features(text):
+    """Words, anatomy, modality and contrast of an upper-cased line (cached per text)"""
+    words = frozenset(_WORD_RE.findall(text))
+    
+    # Modality: the last one named in mapping order wins
+    modality = None
+    for name, variants in _MODALITY_MAPPING:
+        if not words.isdisjoint(variants):
+            modality = name
+    
+    contrast = set()
+    if 'WITH' in words:
+        contrast.add('WITH')
+    if 'WITHOUT' in words or 'WO' in words:
+        contrast.add('WITHOUT')
+    
+    return LineFeatures(text, words, words - _COMMON_WORDS, words & _ANATOMY_WORDS,
+                        modality, frozenset(contrast))
+
 class SimpleWRVUCalculator:
     def __init__(self):
-        self.setup_database()
+        # Parsing and indexing the CSV is skipped while its cache is current
+        if not self.load_database_cache():
+            self.setup_database()
+            self.setup_match_index()
+            self.save_database_cache()
         self.setup_generic_values()
+    
+    def database_cache_key(self):
+        """Identifies the CSV contents (and cache format) a cache was built from"""
+        stat = os.stat("procedure_database.csv")
+        return (_DB_CACHE_VERSION, stat.st_mtime_ns, stat.st_size)
+    
+    def load_database_cache(self):
+        """Load the database and match index from the pickle cache, True if it was current"""
+        import pickle
+        
+        try:
+            with open(_DB_CACHE_FILE, 'rb') as file:
+                cache = pickle.load(file)
+            if cache['key'] != self.database_cache_key():
+                return False
+            for name in _DB_CACHE_ATTRIBUTES:
+                setattr(self, name, cache[name])
+        except Exception:
+            # Missing, unreadable or old-format cache - rebuild it from the CSV
+            return False
+        
+        print(f"Loaded {len(self.procedure_db)} procedures from procedure_database.csv")
+        return True
+    
+    def save_database_cache(self):
+        """Write the database and match index to the pickle cache"""
+        import pickle
+        import tempfile
         
+        cache = {name: getattr(self, name) for name in _DB_CACHE_ATTRIBUTES}
+        cache['key'] = self.database_cache_key()
+        
+        # Write a temp file and rename it over the cache, so another run never
+        # reads a half-written one. The cache is only a speedup, skip it on errors.
+        try:
+            fd, temp_path = tempfile.mkstemp(suffix='.tmp', dir=os.path.dirname(os.path.abspath(_DB_CACHE_FILE)))
+        except OSError:
+            return
+        try:
+            with os.fdopen(fd, 'wb') as file:
+                pickle.dump(cache, file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, _DB_CACHE_FILE)
+        except Exception:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+    
     def setup_database(self):
         """Load procedure database from CSV file"""
         self.procedure_db = {}
@@ -45,10 +234,9 @@ class SimpleWRVUCalculator:
                     cpt = row.get('cpt') or row.get('CPT') or row.get('cpt_code') or row.get('CPT Code')
                     wrvu = row.get('wrvu') or row.get('WRVU') or row.get('wRVU') or row.get('wRVU Value')                    
                     if name and cpt and wrvu:
-                        self.procedure_db[name.upper().strip()] = {
-                            "cpt": str(cpt).strip(),
-                            "wrvu": float(wrvu)
-                        }
+                        # Interned so every copy of a name is one object and key
+                        # comparisons hit the identity fast path
+                        self.procedure_db[sys.intern(name.upper().strip())] = ProcEntry(str(cpt).strip(), float(wrvu))
             
             if len(self.procedure_db) == 0:
                 print("ERROR: No valid procedures found in CSV file!")
@@ -62,6 +250,30 @@ class SimpleWRVUCalculator:
             print("Please check that procedure_database.csv exists and is properly formatted.")
             sys.exit(1)
     
+    def setup_match_index(self):
+        """Index procedures by their significant words for fast candidate lookup"""
+        self._proc_features = {}
+        self._token_index = defaultdict(set)
+        self._unindexed_procs = set()
+        
+        for name in self.procedure_db:
+            features = self._precompute_proc_features(name)
+            self._proc_features[name] = features
+            tokens = features.significant_words
+            for token in tokens:
+                self._token_index[sys.intern(token)].add(name)
+            
+            # A name can still match as a plain substring (e.g. "XR SKULL" inside
+            # "AXR SKULLS") without sharing a whole word with the line, unless one of
+            # its significant words sits between two separators - always check those
+            if not any(m.start() > 0 and m.end() < len(name) and m.group() not in _COMMON_WORDS
+                       for m in _WORD_RE.finditer(name)):
+                self._unindexed_procs.add(name)
+        
+        # Longest names first for better matching, sorted once instead of per line
+        self._sorted_names_by_len = sorted(self.procedure_db.keys(), key=len, reverse=True)
+        self._name_rank = {name: rank for rank, name in enumerate(self._sorted_names_by_len)}
+    
     def setup_generic_values(self):
         """Generic wRVU values by modality"""
         self.generic_wrvus = {
@@ -83,20 +295,17 @@ class SimpleWRVUCalculator:
     
     def preprocess_image(self, image):
         """Preprocess image to improve OCR accuracy"""
-        import numpy as np
-        
-        # Convert PIL to numpy array
-        img_array = np.array(image)
-        
-        # Convert to grayscale if needed
-        if len(img_array.shape) == 3:
-            # Convert RGB to grayscale
-            img_array = np.dot(img_array[...,:3], [0.2989, 0.5870, 0.1140])
+        # Grayscale screenshots need no work at all
+        if image.mode == 'L':
+            return image
         
-        # Convert back to PIL
-        processed_image = Image.fromarray(img_array.astype('uint8'), 'L')
-        
-        return processed_image
+        # PIL converts to grayscale in C with integer BT.601 weights, no float copy
+        return image.convert('L')
+    
+    def looks_blank(self, image):
+        """True if a grayscale image has too little contrast to hold any text"""
+        darkest, lightest = image.getextrema()
+        return lightest - darkest < _MIN_TEXT_CONTRAST
     
     def extract_text_from_image(self, image_path):
         """Extract text from image using best OCR method found"""
@@ -106,6 +315,8 @@ class SimpleWRVUCalculator:
             
             # Use the best method we found: Preprocessed + PSM 11
             processed_image = self.preprocess_image(original_image)
+            if self.looks_blank(processed_image):
+                return ""
             text = pytesseract.image_to_string(processed_image, config='--psm 11')
             
             # print(f"OCR extracted {len(text)} characters, {len(text.splitlines())} lines")
@@ -115,48 +326,80 @@ class SimpleWRVUCalculator:
             print(f"Error processing {image_path}: {e}")
             return ""
     
-    def clean_pacs_text(self, text):
-        """Clean and normalize PACS text for better matching"""
-        # Common PACS cleaning patterns
-        text = text.upper()
-        
-        # Replace common PACS abbreviations and clean formatting
-        replacements = {
-            'CR ': 'XR ',  # Computed Radiography = X-ray
-            'CR\t': 'XR ',
-            'RF ': 'FL ',  # Radiofluoroscopy = Fluoroscopy
-            'RF\t': 'FL ',
-            'XA ': 'ANGIO ',  # X-ray Angiography
-            'XA\t': 'ANGIO ',
-            'BD ': 'DXA ',  # Bone Density
-            'BD\t': 'DXA ',
-            'PT ': 'PET ',  # Positron Emission Tomography
-            'PT\t': 'PET ',
-            'MR ': 'MRI ',  # Magnetic Resonance
-            'MR\t': 'MRI ',
-            'DANGIO': 'DXA',  # OCR error fix
-            'MRIHIP': 'MRI HIP',  # OCR error fix
-            # Clean up formatting
-            '\t': ' ',     # Tabs to spaces
-            '_': ' ',      # Underscores to spaces
-            '—': ' ',      # Em dashes to spaces
-            '-': ' ',      # Hyphens to spaces
-            '  ': ' ',     # Double spaces to single
-            '   ': ' ',    # Triple spaces to single
-        }
+    def extract_text_from_images(self, image_paths):
+        """OCR several images in one Tesseract run, returns their texts or None on failure"""
+        import tempfile
         
-        for old, new in replacements.items():
-            text = text.replace(old, new)
+        # Blank images keep their empty text, the rest are OCR'd together
+        texts = [""] * len(image_paths)
+        ocr_indices = []
+        
+        try:
+            with tempfile.TemporaryDirectory() as tmpdir:
+                page_paths = []
+                for i, image_path in enumerate(image_paths):
+                    processed_image = self.preprocess_image(Image.open(image_path))
+                    if self.looks_blank(processed_image):
+                        continue
+                    page_path = os.path.join(tmpdir, f"{i}.png")
+                    processed_image.save(page_path)
+                    page_paths.append(page_path)
+                    ocr_indices.append(i)
+                
+                if not page_paths:
+                    return texts
+                
+                # Tesseract OCRs every image named in a .txt list file in one process
+                list_path = os.path.join(tmpdir, "list.txt")
+                with open(list_path, 'w', encoding='utf-8') as file:
+                    file.write("\n".join(page_paths) + "\n")
+                
+                text = pytesseract.image_to_string(list_path, config='--psm 11')
+        except Exception:
+            return None
+        
+        # Each page ends with a form feed, only trust the split if every image got one
+        pages = text.split('\f')
+        if len(pages) == len(ocr_indices) + 1 and not pages[-1].strip():
+            pages.pop()
+        if len(pages) != len(ocr_indices):
+            return None
+        
+        for i, page in zip(ocr_indices, pages):
+            texts[i] = page
+        return texts
+    
+    def extract_texts_in_parallel(self, image_paths):
+        """OCR images in batches across worker processes, returns {path: text}"""
+        from concurrent.futures import ProcessPoolExecutor
         
-        # Clean up extra spaces
-        while '  ' in text:
-            text = text.replace('  ', ' ')
+        # Tesseract runs threads of its own, so half the cores avoids oversubscribing
+        workers = min(len(image_paths), max(1, (os.cpu_count() or 1) // 2))
+        chunks = [image_paths[i::workers] for i in range(workers)]
         
-        return text.strip()
+        texts = {}
+        try:
+            if workers == 1:
+                pages_per_chunk = [self.extract_text_from_images(image_paths)]
+            else:
+                with ProcessPoolExecutor(max_workers=workers) as executor:
+                    pages_per_chunk = list(executor.map(self.extract_text_from_images, chunks))
+        except Exception:
+            # Images missing from the result are OCR'd one at a time instead
+            return texts
+        
+        for chunk, pages in zip(chunks, pages_per_chunk):
+            if pages:
+                texts.update(zip(chunk, pages))
+        return texts
+    
+    def clean_pacs_text(self, text):
+        """Clean and normalize PACS text for better matching"""
+        return _clean_pacs_text(text)
     
     def reconstruct_procedure_lines(self, text):
         """Reconstruct fragmented procedure lines from OCR output"""
-        lines = [line.strip() for line in text.splitlines() if line.strip()]
+        lines = [line for line in map(str.strip, text.splitlines()) if line]
         
         reconstructed_lines = []
         current_procedure = ""
@@ -166,8 +409,9 @@ class SimpleWRVUCalculator:
             if len(line) < 3:
                 continue
                 
-            # Date pattern indicates end of procedure line
-            if re.search(r'\d{1,2}-\w{3}-\d{4}', line):
+            # Date pattern indicates end of procedure line (dates always contain
+            # a hyphen, so most lines skip the regex scan)
+            if '-' in line and _DATE_RE.search(line):
                 if current_procedure:
                     # Add date/time to current procedure
                     reconstructed_lines.append(f"{current_procedure} {line}")
@@ -178,8 +422,9 @@ class SimpleWRVUCalculator:
             # Number-only lines are usually counts, skip them
             elif line.isdigit():
                 continue
-            # Modality prefixes (US, CT, MR, etc.) start new procedures
-            elif re.match(r'^(US|CT|MR|XR|CR|RF|FL|PT|PET|BD|DXA|NM|IR)', line.upper()):
+            # Modality prefixes (US, CT, MR, etc.) start new procedures, the
+            # longest is 3 characters so only those need upper-casing
+            elif _MODALITY_PREFIX_RE.match(line[:3].upper()):
                 if current_procedure:
                     # Save previous procedure if we have one
                     reconstructed_lines.append(current_procedure)
@@ -198,114 +443,72 @@ class SimpleWRVUCalculator:
         # print(f"Reconstructed {len(reconstructed_lines)} procedure lines from {len(lines)} OCR lines")
         return reconstructed_lines
     
-    def fuzzy_match(self, proc_name, line):
-        """Very strict matching for procedure names"""
-        proc_upper = proc_name.upper().strip()
-        line_upper = line.upper().strip()
+    def _precompute_line_features(self, text):
+        """Words, anatomy, modality and contrast of an upper-cased line, computed once"""
+        return _line_features(text)
+    
+    def _precompute_proc_features(self, name):
+        """Line features of an upper-cased procedure name plus its length bound"""
+        features = self._precompute_line_features(name)
+        return ProcFeatures(*features, _min_line_len(features.significant_words))
+    
+    def _match_proc_against_features(self, proc, line):
+        """Very strict matching of precomputed procedure / line features"""
+        # Too short to contain the procedure or enough of its words
+        if len(line.text) < proc.min_line_len:
+            return False
         
         # First try exact substring match (most reliable)
-        if proc_upper in line_upper:
+        if proc.text in line.text:
             return True
         
-        # Extract words, keeping important short words
-        proc_words = set(re.findall(r'\b\w+\b', proc_upper))
-        line_words = set(re.findall(r'\b\w+\b', line_upper))
-        
         # STRICT RULE 1: Modality must match exactly
-        modality_mapping = {
-            'XR': ['XR'],
-            'CT': ['CT'],
-            'MRI': ['MRI', 'MR'],
-            'US': ['US'],
-            'FL': ['FL'],
-            'PET': ['PET'],
-            'DXA': ['DXA'],
-            'NM': ['NM']
-        }
-        
-        proc_modality = None
-        line_modality = None
-        
-        for modality, variants in modality_mapping.items():
-            if any(variant in proc_words for variant in variants):
-                proc_modality = modality
-            if any(variant in line_words for variant in variants):
-                line_modality = modality
-        
         # If modalities don't match, reject immediately
-        if proc_modality and line_modality and proc_modality != line_modality:
+        if proc.modality and line.modality and proc.modality != line.modality:
             return False
         
         # STRICT RULE 2: Key anatomical words must match exactly
-        anatomy_words = {
-            'CHEST', 'ABDOMEN', 'PELVIS', 'HEAD', 'BRAIN', 'SPINE', 'LUMBAR', 'CERVICAL', 'THORACIC',
-            'KNEE', 'ANKLE', 'SHOULDER', 'ELBOW', 'HIP', 'FOOT', 'HAND', 'WRIST', 'NECK', 'ORBIT'
-        }
-        
-        proc_anatomy = proc_words.intersection(anatomy_words)
-        line_anatomy = line_words.intersection(anatomy_words)
-        
         # If procedure has anatomy, line must have EXACTLY the same anatomy
-        if proc_anatomy and proc_anatomy != line_anatomy:
+        if proc.anatomy and proc.anatomy != line.anatomy:
             return False
         
         # STRICT RULE 3: Contrast information must match
-        proc_contrast = set()
-        line_contrast = set()
-        
-        if 'WITH' in proc_words:
-            proc_contrast.add('WITH')
-        if 'WITHOUT' in proc_words or 'WO' in proc_words:
-            proc_contrast.add('WITHOUT')
-        if 'WITH' in line_words:
-            line_contrast.add('WITH')
-        if 'WITHOUT' in line_words or 'WO' in line_words:
-            line_contrast.add('WITHOUT')
-        
-        # If contrast specified, must match
-        if proc_contrast and line_contrast and not proc_contrast.intersection(line_contrast):
+        # If contrast specified, must match (empty sets skip the comparison,
+        # isdisjoint avoids building the intersection)
+        if proc.contrast and line.contrast and proc.contrast.isdisjoint(line.contrast):
             return False
         
         # STRICT RULE 4: All significant procedure words must be present
-        # Remove very common words that don't add specificity
-        common_words = {'AND', 'OR', 'THE', 'OF', 'IN', 'ON', 'AT', 'TO', 'FOR', 'VIEW', 'VIEWS'}
-        significant_proc_words = proc_words - common_words
-        significant_line_words = line_words - common_words
-        
         # At least 90% of significant procedure words must be in the line
-        if len(significant_proc_words) > 0:
-            matches = len(significant_proc_words.intersection(significant_line_words))
-            match_percentage = matches / len(significant_proc_words)
+        if len(proc.significant_words) > 0:
+            matches = len(proc.significant_words.intersection(line.significant_words))
+            match_percentage = matches / len(proc.significant_words)
             
             if match_percentage < 0.9:
                 return False
         
         return True
     
+    def fuzzy_match(self, proc_name, line):
+        """Very strict matching for procedure names"""
+        proc = self._precompute_proc_features(proc_name.upper().strip())
+        return self._match_proc_against_features(proc, self._precompute_line_features(line.upper().strip()))
+    
     def try_generic_match(self, line):
         """Try to match using generic modality patterns"""
         line_upper = line.upper()
         
-        modality_patterns = {
-            'CT': ['CT ', 'COMPUTED'],
-            'MRI': ['MRI ', 'MR ', 'MAGNETIC'],
-            'US': ['US ', 'ULTRASOUND', 'ECHO', 'VASCULAR', 'DUPLEX'],
-            'XR': ['XR ', 'RADIOGRAPH'],
-            'MAMMOGRAPHY': ['MAMMO', 'BREAST', 'MG '],
-            'PET': ['PET', 'POSITRON'],
-            'NM': ['NM ', 'NUCLEAR', 'BONE SCAN', 'SPECT', 'LUNG SCAN', 'LIVER SCAN'],
-            'FL': ['FL ', 'FLUORO', 'FLUOROSCOPY', 'ESOPHAGRAM', 'BARIUM', 'UPPER GI', 'RETROGRADE'],
-            'ANGIO': ['ANGIO', 'ANGIOGRAM', 'ANGIOGRAPHY'],
-            'DXA': ['DXA', 'BONE DENSITY', 'DEXA'],
-            'IR': ['IR ', 'EMBOLIZATION', 'KYPHOPLASTY'],
-            'PROCEDURE': ['THORACENTESIS', 'PARACENTESIS']
-        }
+        # One scan finds the leftmost pattern (group N is the Nth modality), only
+        # modalities ranked above it still need checking
+        match = _GENERIC_MODALITY_RE.search(line_upper)
+        if not match:
+            return None
         
-        for modality, patterns in modality_patterns.items():
+        for modality, patterns in _GENERIC_MODALITY_PATTERNS[:match.lastindex - 1]:
             if any(pattern in line_upper for pattern in patterns):
                 return modality
         
-        return None
+        return _GENERIC_MODALITY_PATTERNS[match.lastindex - 1][0]
     
     def find_procedures_in_reconstructed_text(self, procedure_lines, source_file=""):
         """Find procedures in reconstructed text lines with simplified debug output"""
@@ -322,8 +525,12 @@ class SimpleWRVUCalculator:
             # Clean PACS text
             cleaned_line = self.clean_pacs_text(line)
             
-            # Sort procedures by length (longest first) for better matching
-            sorted_procedures = sorted(self.procedure_db.keys(), key=len, reverse=True)
+            # Only procedures sharing a significant word with the line can match,
+            # tried longest first for better matching
+            line_features = self._precompute_line_features(cleaned_line)
+            candidates = self._unindexed_procs.union(
+                *(self._token_index[token] for token in line_features.words if token in self._token_index))
+            sorted_procedures = sorted(candidates, key=self._name_rank.__getitem__)
             
             # Try exact matches first
             matched = False
@@ -331,7 +538,7 @@ class SimpleWRVUCalculator:
             best_match_score = 0
             
             for proc_name in sorted_procedures:
-                if self.fuzzy_match(proc_name, cleaned_line):
+                if self._match_proc_against_features(self._proc_features[proc_name], line_features):
                     match_score = len(proc_name.split())
                     if match_score > best_match_score:
                         best_match = proc_name
@@ -397,10 +604,7 @@ class SimpleWRVUCalculator:
     def calculate_wrvus(self, procedures):
         """Calculate total wRVUs"""
         # Count procedures
-        procedure_counts = {}
-        for proc in procedures:
-            name = proc['procedure']
-            procedure_counts[name] = procedure_counts.get(name, 0) + 1
+        procedure_counts = Counter(proc['procedure'] for proc in procedures)
         
         results = []
         total_exams = 0
@@ -416,8 +620,8 @@ class SimpleWRVUCalculator:
                 is_generic = True
             else:
                 proc_data = self.procedure_db[proc_name]
-                wrvu_each = proc_data["wrvu"]
-                cpt = proc_data["cpt"]
+                wrvu_each = proc_data.wrvu
+                cpt = proc_data.cpt
                 is_generic = False
             
             total_proc_wrvu = wrvu_each * count
@@ -450,6 +654,14 @@ class SimpleWRVUCalculator:
         print(f"Processing {len(image_paths)} image(s)...")
         all_procedures = []
         
+        # OCR the images up front, in one Tesseract run per worker process to pay
+        # its startup cost once per batch, images are OCR'd one at a time below
+        # if their batch fails
+        existing_paths = list(dict.fromkeys(path for path in image_paths if os.path.exists(path)))
+        batch_texts = {}
+        if len(existing_paths) > 1:
+            batch_texts = self.extract_texts_in_parallel(existing_paths)
+        
         for i, image_path in enumerate(image_paths, 1):
             if not os.path.exists(image_path):
                 print(f"File not found: {image_path}")
@@ -458,7 +670,9 @@ class SimpleWRVUCalculator:
             print(f"\nIMAGE {i}: {os.path.basename(image_path)}")
             
             # Extract text (suppress detailed OCR output)
-            text = self.extract_text_from_image(image_path)
+            text = batch_texts.get(image_path)
+            if text is None:
+                text = self.extract_text_from_image(image_path)
             
             if not text.strip():
                 print("ERROR: No text extracted")